@@ -25,12 +25,30 @@ USAGE (one copy-paste):
    HOST=0.0.0.0
    PORT=8080
    TZ=Europe/Rome
+   
+   # Adaptive polling (server tells clients how long to wait between polls):
+   
+   AGORHOUR_POLL_BASE_MS=2000        # interval when the feed is active and load is normal
+   AGORHOUR_POLL_MIN_MS=1000
+   AGORHOUR_POLL_MAX_MS=15000
+   AGORHOUR_POLL_BUDGET_RPS=50       # API requests/second each server process is willing to serve
+   AGORHOUR_POLL_MAX_INFLIGHT=32     # concurrent API requests (per process) before clients are slowed down
+   
+   # Tracing / profiling (off by default):
+   
+   AGORHOUR_TRACE=1                  # span tree per request and per hourly_tick run
+   AGORHOUR_TRACE_SLOW_MS=500        # traces slower than this are written out
+   AGORHOUR_TRACE_SAMPLE=1.0         # fraction of slow traces to keep
+   AGORHOUR_TRACE_FILE=agorhour-traces.jsonl
+   AGORHOUR_PROFILE=1                # enables /api/debug/profile (needs x-agorhour-secret)
 
 WHAT YOU GET:
 
 - FastAPI server with endpoints per spec:
   /api/session, /api/hour/current, /api/hour/answer, /api/answer/react, /api/hour/top
+  - /api/hour/current pages the feed (limit + keyset cursor) and can rank it (order=score)
   - /api/cron/hourly  (protected; external cron) and built-in scheduler (APScheduler)
+  - /api/debug/profile (protected; AGORHOUR_PROFILE=1) → collapsed stacks for flamegraphs
 - Supabase persistence (tables auto-created if SUPABASE_DB_URL provided; else skip)
 - Ephemerality: auto-seed one question/hour, purge expired hour data shortly after hour end
 - Working Meter (client & server), Expose confirmation for RED posts
@@ -39,7 +57,8 @@ WHAT YOU GET:
 
 NOTE:
 
-- Uses Supabase REST with service role; Realtime is approximated by client polling (2s).
+- Uses Supabase REST with service role; Realtime is approximated by client polling
+  (2s by default, adapted by the server via poll_ms / X-Poll-Interval-Ms).
 - If you insist on Supabase Realtime channels, wire your Next.js client later; the DB schema matches.
 """
 
@@ -67,12 +86,14 @@ if missing: pip_install(*missing)
 
 # — Imports —
 
-import os, re, random
+import os, re, random, json, base64, time, threading, contextvars, uuid, queue, math
+from collections import deque, Counter
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from typing import Optional, Dict, Any, Tuple
 
-from fastapi import FastAPI, Request, HTTPException, Body
+from fastapi import FastAPI, Request, Response, HTTPException, Body, Depends
 from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -103,6 +124,18 @@ AGORHOUR_CRON_SECRET = os.getenv("AGORHOUR_CRON_SECRET","change-me")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL","gpt-4o-mini")
 
+POLL_BASE_MS = int(os.getenv("AGORHOUR_POLL_BASE_MS","2000"))
+POLL_MIN_MS = int(os.getenv("AGORHOUR_POLL_MIN_MS","1000"))
+POLL_MAX_MS = int(os.getenv("AGORHOUR_POLL_MAX_MS","15000"))
+POLL_BUDGET_RPS = float(os.getenv("AGORHOUR_POLL_BUDGET_RPS","50"))
+POLL_MAX_INFLIGHT = int(os.getenv("AGORHOUR_POLL_MAX_INFLIGHT","32"))
+
+TRACE_ENABLED = os.getenv("AGORHOUR_TRACE","0") == "1"
+TRACE_SLOW_MS = float(os.getenv("AGORHOUR_TRACE_SLOW_MS","500"))
+TRACE_SAMPLE = float(os.getenv("AGORHOUR_TRACE_SAMPLE","1.0"))
+TRACE_FILE = os.getenv("AGORHOUR_TRACE_FILE","agorhour-traces.jsonl")
+PROFILE_ENABLED = os.getenv("AGORHOUR_PROFILE","0") == "1"
+
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     print("ERROR: Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY in env.")
     sys.exit(1)
@@ -110,6 +143,125 @@ if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 ai_client: Optional[OpenAI] = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
+# — Tracing (opt-in: AGORHOUR_TRACE=1) —
+
+class Span:
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children = []
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "children": [c.to_dict(origin) for c in self.children],
+        }
+
+# the innermost open span; copied into threadpool workers, so handler spans nest under the request
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("agorhour_span", default=None)
+_trace_queue: "queue.Queue" = queue.Queue(maxsize=1000)
+
+@contextmanager
+def span(name: str):
+    parent = _current_span.get() if TRACE_ENABLED else None
+    if parent is None:
+        yield
+        return
+    sp = Span(name)
+    parent.children.append(sp)
+    token = _current_span.set(sp)
+    try:
+        yield
+    finally:
+        sp.end = time.perf_counter()
+        _current_span.reset(token)
+
+@contextmanager
+def trace_root(name: str, meta: Optional[Dict[str, Any]] = None):
+    """Root of a span tree (one request / one hourly_tick run); nested roots become plain spans."""
+    if not TRACE_ENABLED or _current_span.get() is not None:
+        with span(name):
+            yield meta
+        return
+    root = Span(name)
+    token = _current_span.set(root)
+    meta = {} if meta is None else meta
+    try:
+        yield meta
+    finally:
+        root.end = time.perf_counter()
+        _current_span.reset(token)
+        duration_ms = (root.end - root.start) * 1000
+        if duration_ms >= TRACE_SLOW_MS and random.random() < TRACE_SAMPLE:
+            write_trace(root, duration_ms, meta)
+
+def write_trace(root: Span, duration_ms: float, meta: Dict[str, Any]):
+    # called from the request middleware (event loop): only enqueue, the writer thread does the I/O
+    try:
+        _trace_queue.put_nowait((datetime.now(timezone.utc), root, duration_ms, meta))
+    except queue.Full:
+        pass  # writer is behind; dropping a sample beats stalling requests
+
+def trace_writer():
+    while True:
+        ts, root, duration_ms, meta = _trace_queue.get()
+        rec = {"ts": ts.isoformat(), "name": root.name,
+               "duration_ms": round(duration_ms, 3), **meta, "spans": root.to_dict(root.start)}
+        try:
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec) + "\n")
+        except OSError as e:
+            print(f"WARN: could not write trace to {TRACE_FILE}: {e}")
+
+def mark_handler_start():
+    # FastAPI runs this sync dependency on the threadpool just before the handler. The gap since the
+    # request root opened covers middleware, body/param parsing and waiting for a worker thread; it does
+    # not include the endpoint's own (separate) threadpool dispatch.
+    root = _current_span.get()
+    if root is not None:
+        q = Span("pre-handler wait")
+        q.start, q.end = root.start, time.perf_counter()
+        root.children.append(q)
+
+def instrument_postgrest():
+    # every supabase.table(...)...execute() ends in one of these builders → one span per PostgREST call
+    try:
+        from postgrest._sync import request_builder as rb
+    except ImportError:
+        print("WARN: postgrest internals not found → DB calls will not be traced.")
+        return
+    for cls_name in ("SyncQueryRequestBuilder", "SyncSingleRequestBuilder", "SyncMaybeSingleRequestBuilder"):
+        cls = getattr(rb, cls_name, None)
+        if cls is None or "execute" not in vars(cls):
+            continue
+        cls.execute = traced_execute(cls.execute)
+
+def traced_execute(original):
+    def execute(self, *args, **kwargs):
+        # postgrest 0.x MaybeSingle.execute calls Single.execute → don't open a second span
+        if getattr(self, "_agorhour_in_execute", False):
+            return original(self, *args, **kwargs)
+        # postgrest ≥1 keeps method/path on self.request (path is an httpx.URL); 0.x keeps them on the builder
+        req = getattr(self, "request", self)
+        path = getattr(req, "path", "?")
+        with span(f"db {getattr(req, 'http_method', '?')} {str(getattr(path, 'path', path))}"):
+            self._agorhour_in_execute = True
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                self._agorhour_in_execute = False
+    return execute
+
+if TRACE_ENABLED:
+    instrument_postgrest()
+    threading.Thread(target=trace_writer, name="agorhour-trace-writer", daemon=True).start()
+
 # — Schema (per brief) —
 
 DDL_SQL = """
@@ -137,9 +289,16 @@ create table if not exists answers (
     stance varchar(8) check (stance in ('AGREE','DISAGREE')) null,
     text varchar(120) not null,
     exposed boolean default false,
+    score int not null default 0,
+    last_activity_at timestamptz default now(),
     created_at timestamptz default now()
 );
 
+-- LIKE-UNLIKE tally for the score view (maintained by trg_reactions_score below)
+alter table answers add column if not exists score int not null default 0;
+-- Last post/reaction on the answer (set by the same trigger); drives the adaptive poll interval
+alter table answers add column if not exists last_activity_at timestamptz default now();
+
 create table if not exists reactions (
     id uuid primary key default gen_random_uuid(),
     answer_id uuid references answers(id) on delete cascade,
@@ -152,7 +311,39 @@ create table if not exists reactions (
 -- Helpful indexes
 create index if not exists idx_hour_questions_hour_key on hour_questions(hour_key);
 create index if not exists idx_answers_hour on answers(hour_id);
+-- Keyset pagination: (hour_id, created_at, id) for the timeline, (hour_id, score, id) for the ranked view
+create index if not exists idx_answers_hour_created on answers(hour_id, created_at, id);
+create index if not exists idx_answers_hour_score on answers(hour_id, score desc, id);
+create index if not exists idx_answers_hour_activity on answers(hour_id, last_activity_at desc);
 create index if not exists idx_reactions_answer on reactions(answer_id);
+
+-- answers.score follows reactions in the same transaction (atomic +/-1, no app-side read-then-write)
+create or replace function reactions_score_sync() returns trigger language plpgsql as $$
+begin
+    if tg_op in ('INSERT','UPDATE') then
+        update answers set score = score + (case new.kind when 'LIKE' then 1 when 'UNLIKE' then -1 else 0 end),
+            last_activity_at = now()
+        where id = new.answer_id;
+    end if;
+    if tg_op in ('DELETE','UPDATE') then
+        update answers set score = score - (case old.kind when 'LIKE' then 1 when 'UNLIKE' then -1 else 0 end),
+            last_activity_at = now()
+        where id = old.answer_id;
+    end if;
+    return null;
+end;
+$$;
+drop trigger if exists trg_reactions_score on reactions;
+create trigger trg_reactions_score after insert or update or delete on reactions
+    for each row execute function reactions_score_sync();
+
+-- Backfill (idempotent): recount from reactions so rows reacted to before the trigger existed rank correctly
+update answers a set score = coalesce((
+    select sum(case r.kind when 'LIKE' then 1 when 'UNLIKE' then -1 else 0 end)
+    from reactions r where r.answer_id = a.id), 0)
+where a.score is distinct from coalesce((
+    select sum(case r.kind when 'LIKE' then 1 when 'UNLIKE' then -1 else 0 end)
+    from reactions r where r.answer_id = a.id), 0);
 """
 
 def run_ddl_if_possible():
@@ -185,10 +376,78 @@ def end_of_hour(dt: datetime) -> datetime:
     _, end = hour_window(dt)
     return end
 
-def score_for_answer(answer_id: str) -> int:
-    likes = supabase.table("reactions").select("id").eq("answer_id", answer_id).eq("kind","LIKE").execute().data
-    unlikes = supabase.table("reactions").select("id").eq("answer_id", answer_id).eq("kind","UNLIKE").execute().data
-    return (len(likes or [])) - (len(unlikes or []))
+# — Feed pagination (keyset cursors) —
+
+FEED_DEFAULT_LIMIT = 50
+FEED_MAX_LIMIT = 200
+FEED_ORDERS = ("created", "newest", "score")
+ANSWER_COLUMNS = "id, session_id, text, stance, exposed, score, created_at"
+
+def parse_ts(value: str) -> datetime:
+    # PostgREST trims trailing zeros in fractional seconds ("…21.27+00:00"); fromisoformat on 3.10 wants 3 or 6 digits
+    v = value.replace("Z", "+00:00")
+    v = re.sub(r"\.(\d{1,6})\d*", lambda m: "." + m.group(1).ljust(6, "0"), v, count=1)
+    return datetime.fromisoformat(v)
+
+def encode_cursor(row: Dict[str, Any], order: str) -> str:
+    # opaque to the client: the sort key of the last row it received
+    key = {"s": row["score"], "id": row["id"]} if order == "score" else {"c": row["created_at"], "id": row["id"]}
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order: str) -> Dict[str, Any]:
+    # client-controlled → every value is re-typed before it reaches the or_() filter string
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        answer_id = str(uuid.UUID(str(key["id"])))
+        if order == "score":
+            return {"s": int(key["s"]), "id": answer_id}
+        return {"c": parse_ts(str(key["c"])).isoformat(), "id": answer_id}
+    except Exception:
+        raise HTTPException(400, "Invalid cursor.")
+
+def fetch_answers_page(hour_id: str, order: str, limit: int, cursor: Optional[str] = None):
+    """
+    One page of answers for an hour, keyset-paged on a unique sort key:
+      created → (created_at, id) asc   newest → (created_at, id) desc   score → (score desc, id asc)
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Limits (best effort, fine for a live feed that is re-polled, not an exact export):
+      - created/newest: created_at is the inserting transaction's start time, so a row that commits
+        after a page was read but carries an earlier timestamp falls behind the cursor and is skipped.
+      - score: reactions move the sort key mid-hour, so an answer can repeat or be skipped across pages.
+    """
+    q = supabase.table("answers").select(ANSWER_COLUMNS).eq("hour_id", hour_id)
+    if cursor:
+        k = decode_cursor(cursor, order)
+        if order == "score":
+            q = q.or_(f'score.lt.{k["s"]},and(score.eq.{k["s"]},id.gt.{k["id"]})')
+        else:
+            op = "lt" if order == "newest" else "gt"
+            q = q.or_(f'created_at.{op}."{k["c"]}",and(created_at.eq."{k["c"]}",id.{op}.{k["id"]})')
+    if order == "score":
+        q = q.order("score", desc=True).order("id", desc=False)
+    else:
+        desc = order == "newest"
+        q = q.order("created_at", desc=desc).order("id", desc=desc)
+    # fetch one extra row to know whether another page exists without a count query
+    rows = q.limit(limit + 1).execute().data or []
+    next_cursor = encode_cursor(rows[limit - 1], order) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def annotate_answers(rows):
+    # one lookup for every author on the page instead of one per answer
+    session_ids = list({a["session_id"] for a in rows if a.get("session_id")})
+    seeds = {}
+    if session_ids:
+        sess = supabase.table("anon_sessions").select("id, avatar_seed").in_("id", session_ids).execute().data or []
+        seeds = {s["id"]: s["avatar_seed"] for s in sess}
+    out = []
+    for a in rows:
+        a2 = dict(a)
+        a2["score"] = a.get("score") or 0
+        a2["avatar"] = None if a["exposed"] else avatar_from_seed(seeds.get(a["session_id"], 0))
+        a2["exposed_badge"] = bool(a["exposed"])
+        out.append(a2)
+    return out
 
 EMOJI_POOL = ["😶","🫥","🫣","🫡","😏","😐","🙃","😎","🥸","🤖","👻","👽","🐸","🦊","🐼","🐨","🦉","🐺","🦄","🐙"]
 
@@ -212,10 +471,12 @@ MILD_YELLOW_PATTERNS = [
 def meter_color(text: str) -> str:
     t = text.strip().lower()
     if not t: return "red"
-    for p in HARD_RED_PATTERNS:
-        if re.search(p, t): return "red"
-    for p in MILD_YELLOW_PATTERNS:
-        if re.search(p, t): return "yellow"
+    with span("meter_color.red"):
+        for p in HARD_RED_PATTERNS:
+            if re.search(p, t): return "red"
+    with span("meter_color.yellow"):
+        for p in MILD_YELLOW_PATTERNS:
+            if re.search(p, t): return "yellow"
     if len(text) > 110: return "yellow"
     return "green"
 
@@ -253,12 +514,13 @@ def ai_generate_question(last_headline: str, next_theme: str) -> str:
         f"Recent headline: {last_headline[:180]}\nTheme: {next_theme}"
     )
     try:
-        resp = ai_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}],
-            temperature=0.7,
-            max_tokens=60,
-        )
+        with span(f"ai {OPENAI_MODEL}"):
+            resp = ai_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user_prompt}],
+                temperature=0.7,
+                max_tokens=60,
+            )
         q = resp.choices[0].message.content.strip().strip('"')
         return q[:120]
     except Exception:
@@ -269,6 +531,95 @@ def current_theme_for_hour(dt: datetime) -> str:
     base = int(dt.astimezone(timezone.utc).strftime("%s")) // 3600
     return THEMES[base % len(THEMES)]
 
+# — Adaptive polling (server-directed poll interval) —
+
+LOAD_WINDOW_SECONDS = 10
+QUIET_AFTER_SECONDS = 60      # no new answers/reactions for this long → start slowing down
+HOUR_END_FAST_SECONDS = 60    # last minute of the hour → poll faster for the reveal
+
+_load_lock = threading.Lock()
+_request_times = deque()      # monotonic timestamps of recent API requests
+_inflight = 0
+
+def load_request_started():
+    global _inflight
+    now = time.monotonic()
+    with _load_lock:
+        _inflight += 1
+        _request_times.append(now)
+        while _request_times and _request_times[0] < now - LOAD_WINDOW_SECONDS:
+            _request_times.popleft()
+
+def load_request_finished():
+    global _inflight
+    with _load_lock:
+        _inflight -= 1
+
+def seconds_since_feed_activity(hour_id: str, now: datetime) -> float:
+    # read from the DB, not process memory, so every worker/instance sees posts handled by the others
+    row = (supabase.table("answers").select("last_activity_at").eq("hour_id", hour_id)
+        .order("last_activity_at", desc=True).limit(1).execute().data)
+    start, _ = hour_window(now)
+    latest = start
+    if row and row[0].get("last_activity_at"):
+        latest = max(start, parse_ts(row[0]["last_activity_at"]))
+    return max(0.0, (now - latest).total_seconds())
+
+def current_load() -> Tuple[float, int]:
+    """(requests per second over the window, in-flight requests) — per process"""
+    now = time.monotonic()
+    with _load_lock:
+        while _request_times and _request_times[0] < now - LOAD_WINDOW_SECONDS:
+            _request_times.popleft()
+        rate = len(_request_times) / LOAD_WINDOW_SECONDS
+        inflight = _inflight
+    return rate, inflight
+
+def poll_interval_ms(seconds_left: int, idle: float, rate: float, inflight: int, issued_ms: float) -> int:
+    """
+    Pure controller behind recommended_poll_ms (no I/O, no globals besides config → unit-testable).
+    issued_ms is the smoothed interval this process has been handing out: clients obeying it
+    at the observed rate means roughly rate * issued_ms active pollers, and the interval that
+    holds them at the budget is clients / budget (not base * rate / budget, which undershoots).
+    """
+    ms = float(POLL_BASE_MS)
+    # quiet feed: back off gradually, up to 4x base after a few idle minutes
+    if idle > QUIET_AFTER_SECONDS:
+        ms *= min(4.0, 1.0 + (idle - QUIET_AFTER_SECONDS) / QUIET_AFTER_SECONDS)
+    # hour about to end: tighten so clients catch the top-answer reveal
+    if seconds_left <= HOUR_END_FAST_SECONDS:
+        ms = min(ms, POLL_BASE_MS / 2)
+    # over budget: the interval must be at least active_clients / budget
+    if POLL_BUDGET_RPS > 0 and rate > 0:
+        clients = rate * issued_ms / 1000.0
+        ms = max(ms, clients / POLL_BUDGET_RPS * 1000.0)
+    # too many concurrent requests: in-flight scales with request rate, so stretch what we issue now
+    if POLL_MAX_INFLIGHT > 0 and inflight > POLL_MAX_INFLIGHT:
+        ms = max(ms, issued_ms * inflight / POLL_MAX_INFLIGHT)
+    # never schedule the next poll past the end of the hour, whatever the load says
+    ms = min(ms, max(POLL_MIN_MS, seconds_left * 1000.0))
+    return int(max(POLL_MIN_MS, min(POLL_MAX_MS, ms)))
+
+def smooth_issued_ms(prev_ms: float, new_ms: float, dt: float) -> float:
+    # time-based EMA over LOAD_WINDOW_SECONDS, so it tracks the intervals behind the measured rate
+    alpha = 1.0 - math.exp(-max(0.0, dt) / LOAD_WINDOW_SECONDS)
+    return prev_ms + alpha * (new_ms - prev_ms)
+
+_issued_ms = float(POLL_BASE_MS)
+_issued_at = time.monotonic()
+
+def recommended_poll_ms(seconds_left: int, idle: float) -> int:
+    global _issued_ms, _issued_at
+    rate, inflight = current_load()
+    with _load_lock:
+        issued = _issued_ms
+    ms = poll_interval_ms(seconds_left, idle, rate, inflight, issued)
+    now = time.monotonic()
+    with _load_lock:
+        _issued_ms = smooth_issued_ms(_issued_ms, ms, now - _issued_at)
+        _issued_at = now
+    return ms
+
 # — Hourly lifecycle —
 
 GRACE_SECONDS_AFTER_HOUR = 8  # show "Top Answer" briefly before purge
@@ -306,8 +657,11 @@ def purge_expired():
         supabase.table("hour_questions").delete().in_("id", ids).execute()
 
 def hourly_tick():
-    ensure_current_hour_question()
-    purge_expired()
+    with trace_root("hourly_tick"):
+        with span("ensure_current_hour_question"):
+            ensure_current_hour_question()
+        with span("purge_expired"):
+            purge_expired()
 
 # Scheduler (runs every 30s so we don't miss exact boundaries even on cheap hosts)
 
@@ -317,12 +671,36 @@ scheduler.start()
 
 # — FastAPI app —
 
-app = FastAPI(title="AgorHour")
+app = FastAPI(title="AgorHour", dependencies=[Depends(mark_handler_start)] if TRACE_ENABLED else [])
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
+    allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["X-Poll-Interval-Ms"]
 )
 
+@app.middleware("http")
+async def track_load(request: Request, call_next):
+    # feeds recommended_poll_ms(): request rate + concurrency over the API only
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    load_request_started()
+    try:
+        return await call_next(request)
+    finally:
+        load_request_finished()
+
+async def trace_requests(request: Request, call_next):
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    with trace_root(f"{request.method} {request.url.path}", {"query": str(request.url.query)}) as meta:
+        response = await call_next(request)
+        meta["status"] = response.status_code
+        return response
+
+# registered only when opted in: an idle BaseHTTPMiddleware hop still costs every request a task + streaming
+if TRACE_ENABLED:
+    app.middleware("http")(trace_requests)
+
 # — API Endpoints (per brief) —
 
 @app.post("/api/session")
@@ -335,34 +713,37 @@ def create_or_get_session():
     return s
 
 @app.get("/api/hour/current")
-def current_hour(include_answers: int = 1):
+def current_hour(response: Response, include_answers: int = 1, limit: int = FEED_DEFAULT_LIMIT,
+                 cursor: Optional[str] = None, order: str = "created", top: int = 0):
+    """
+    poll_ms (also X-Poll-Interval-Ms header): how long the client should wait before polling again.
+    limit/cursor: keyset pagination over the feed; pass back next_cursor to get the following page.
+    order: created (oldest first) | newest | score (highest first).
+    top: if > 0, also return the top-N answers by score in "top" (first page of order=score).
+    """
+    if order not in FEED_ORDERS:
+        raise HTTPException(400, "Invalid order.")
+    limit = max(1, min(limit, FEED_MAX_LIMIT))
+    top = max(0, min(top, FEED_MAX_LIMIT))
     h = ensure_current_hour_question()
     # compute countdown (seconds left in local TZ)
     now = now_tz()
     end = end_of_hour(now).astimezone(TZINFO)
     seconds_left = max(0, int((end - now).total_seconds()))
+    poll_ms = recommended_poll_ms(seconds_left, seconds_since_feed_activity(h["id"], now))
+    response.headers["X-Poll-Interval-Ms"] = str(poll_ms)
     resp = {
         "hour": {"id": h["id"], "hour_key": h["hour_key"], "text": h["text"], "expires_at": h["expires_at"], "open_mode": h.get("open_mode", True)},
-        "countdown_seconds": seconds_left
+        "countdown_seconds": seconds_left,
+        "poll_ms": poll_ms
     }
     if include_answers:
-        ans = (supabase.table("answers")
-            .select("id, session_id, text, stance, exposed, created_at")
-            .eq("hour_id", h["id"])
-            .order("created_at", desc=False)
-            .execute().data) or []
-        # Annotate with score and avatar
-        out = []
-        for a in ans:
-            sc = score_for_answer(a["id"])
-            sess = supabase.table("anon_sessions").select("avatar_seed").eq("id", a["session_id"]).limit(1).execute().data
-            avatar = avatar_from_seed((sess[0]["avatar_seed"] if sess else 0))
-            a2 = dict(a)
-            a2["score"] = sc
-            a2["avatar"] = None if a["exposed"] else avatar
-            a2["exposed_badge"] = bool(a["exposed"])
-            out.append(a2)
-        resp["answers"] = out
+        rows, next_cursor = fetch_answers_page(h["id"], order, limit, cursor)
+        resp["answers"] = annotate_answers(rows)
+        resp["next_cursor"] = next_cursor
+        if top:
+            top_rows, _ = fetch_answers_page(h["id"], "score", top)
+            resp["top"] = annotate_answers(top_rows)
     return resp
 
 @app.post("/api/hour/answer")
@@ -418,20 +799,18 @@ def react(payload: Dict[str, Any] = Body(...)):
     if existing:
         supabase.table("reactions").delete().eq("answer_id", answer_id).eq("session_id", session_id).execute()
     supabase.table("reactions").insert({"answer_id": answer_id, "session_id": session_id, "kind": kind}).execute()
-    return {"ok": True, "score": score_for_answer(answer_id)}
+    # answers.score is maintained by the reactions trigger (see DDL_SQL)
+    row = supabase.table("answers").select("score").eq("id", answer_id).limit(1).execute().data
+    return {"ok": True, "score": row[0]["score"] if row else 0}
 
 @app.get("/api/hour/top")
 def top_answer():
     h = ensure_current_hour_question()
-    ans = (supabase.table("answers")
-        .select("id, text")
-        .eq("hour_id", h["id"]).execute().data) or []
+    ans, _ = fetch_answers_page(h["id"], "score", 1)
     if not ans:
         return {"top": None}
-    scored = [(a["id"], a["text"], score_for_answer(a["id"])) for a in ans]
-    scored.sort(key=lambda x: x[2], reverse=True)
-    best = scored[0]
-    return {"top": {"answer_id": best[0], "text": best[1], "score": best[2]}}
+    best = ans[0]
+    return {"top": {"answer_id": best["id"], "text": best["text"], "score": best["score"]}}
 
 @app.post("/api/cron/hourly")
 def cron_hourly(req: Request):
@@ -440,6 +819,58 @@ def cron_hourly(req: Request):
     hourly_tick()
     return {"ok": True}
 
+# — Live profiler (opt-in: AGORHOUR_PROFILE=1) —
+
+PROFILE_MAX_SECONDS = 60
+PROFILE_DEFAULT_HZ = 100
+PROFILE_MAX_HZ = 200   # each tick walks every thread's frames under the GIL on the live server
+# leaf frames of a parked thread (threadpool worker / trace writer on queue.get → Condition.wait,
+# APScheduler on Event.wait, the event loop in selector.select); skipped unless idle=1, like py-spy
+IDLE_LEAF_FRAMES = {"wait", "get", "select", "sleep", "poll"}
+
+def sample_stacks(seconds: float, hz: int, include_idle: bool = False) -> Counter:
+    """
+    Wall-clock sampler over every thread (py-spy style, in-process): each tick grabs
+    sys._current_frames() and counts the root→leaf stack. Requests blocked on PostgREST/OpenAI
+    sockets show up too, which cProfile would miss. Parked threads (leaf in IDLE_LEAF_FRAMES)
+    are dropped unless include_idle, so they don't drown out request work in the flamegraph.
+    """
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    interval = 1.0 / hz
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            if not include_idle and frame.f_code.co_name in IDLE_LEAF_FRAMES:
+                continue
+            parts = []
+            while frame is not None:
+                co = frame.f_code
+                parts.append(f"{co.co_name} ({os.path.basename(co.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            parts.append(names.get(tid, f"thread-{tid}"))
+            stacks[";".join(reversed(parts))] += 1
+        time.sleep(interval)
+    return stacks
+
+@app.get("/api/debug/profile", response_class=PlainTextResponse)
+def debug_profile(req: Request, seconds: float = 10, hz: int = PROFILE_DEFAULT_HZ, idle: int = 0):
+    """
+    Collapsed stacks ("frame;frame;frame count" per line) → flamegraph.pl / speedscope.
+    idle=1 keeps parked threads (waits, queue gets, selector) in the output.
+    """
+    if not PROFILE_ENABLED:
+        raise HTTPException(404, "Not Found")
+    if req.headers.get("x-agorhour-secret") != AGORHOUR_CRON_SECRET:
+        raise HTTPException(401, "Unauthorized")
+    seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+    hz = max(1, min(hz, PROFILE_MAX_HZ))
+    stacks = sample_stacks(seconds, hz, include_idle=bool(idle))
+    return "\n".join(f"{stack} {n}" for stack, n in stacks.most_common()) + "\n"
+
 # — Minimal Frontend (PWA) —
 
 INDEX_HTML = """<!DOCTYPE html>
@@ -452,25 +883,25 @@ INDEX_HTML = """<!DOCTYPE html>
 <meta name="theme-color" content="#0b0b0c"/>
 <title>AgorHour</title>
 <script>
-if ('serviceWorker' in navigator) {{
+if ('serviceWorker' in navigator) {
   window.addEventListener('load', ()=>navigator.serviceWorker.register('/sw.js'));
-}}
+}
 </script>
 <script src="https://cdn.tailwindcss.com"></script>
 <style>
-:root {{
+:root {
   --bg:#0b0b0c; --card:#151518; --txt:#eaeaea; --g:#22c55e; --y:#eab308; --r:#ef4444;
-}}
-body {{ background:var(--bg); color:var(--txt); }}
-.card {{ background:var(--card); border-radius:14px; }}
-.meter-bar {{ height:8px; border-radius:6px; background:#333; overflow:hidden; }}
-.meter-fill {{ height:8px; width:100%; }}
-avatar {{
+}
+body { background:var(--bg); color:var(--txt); }
+.card { background:var(--card); border-radius:14px; }
+.meter-bar { height:8px; border-radius:6px; background:#333; overflow:hidden; }
+.meter-fill { height:8px; width:100%; }
+avatar {
   width:36px; height:36px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-size:18px;
-}}
-.badge-exposed {{ background:var(--r); color:black; font-weight:700; padding:0 8px; border-radius:10px; font-size:12px; }}
-.btn {{ background:#2a2a2f; padding:10px 14px; border-radius:10px; }}
-.btn[disabled] {{ opacity:.5 }}
+}
+.badge-exposed { background:var(--r); color:black; font-weight:700; padding:0 8px; border-radius:10px; font-size:12px; }
+.btn { background:#2a2a2f; padding:10px 14px; border-radius:10px; }
+.btn[disabled] { opacity:.5 }
 </style>
 </head>
 <body class="min-h-screen">
@@ -512,16 +943,22 @@ const API = location.origin;
 let session = null;
 let currentHourId = null;
 let alreadyPosted = false;
+let topShownForHour = null;  // hour id whose top answer was already revealed
+let hourEndsAt = 0;          // local clock (ms) when the current hour ends, re-seeded by every poll
+const FEED_PAGE = 50;  // top 50 by score + newest 50, never the whole hour
+const POLL_DEFAULT_MS = 2000;
+const POLL_ERROR_MS = 10000;
+const POLL_JITTER = 0.2;   // ±20% so tabs opened together drift apart
 
-function hslStr(hsl) {{ return hsl; }}
+function hslStr(hsl) { return hsl; }
 
 async function ensureSession(){
   const s = localStorage.getItem('agorhour_session');
-  if (s) {{ session = JSON.parse(s); return; }}
+  if (s) { session = JSON.parse(s); return; }
   const r = await fetch(API+'/api/session', {method:'POST'});
   session = await r.json();
   localStorage.setItem('agorhour_session', JSON.stringify(session));
-}}
+}
 
 function meterColor(t){
   const text = (t||'').trim();
@@ -529,30 +966,43 @@ function meterColor(t){
   if (/[A-Z]{5,}/.test(text) || /[!?.]{3,}/.test(text) || /(damn|hell|crap)/i.test(text) || text.length>110) return 'yellow';
   if (/(kill|murder|rape|lynch|gas|exterminate|doxx|address|phone|ssn)/i.test(text)) return 'red';
   return 'green';
-}}
+}
 
 function setMeter(color){
   const el=document.getElementById('meter');
   el.style.background = color==='green'?'var(--g)':(color==='yellow'?'var(--y)':'var(--r)');
-}}
+}
 
 function fmtCountdown(sec){
   const m = Math.floor(sec/60).toString().padStart(2,'0');
   const s = (sec%60).toString().padStart(2,'0');
   return m+':'+s;
-}}
+}
 
 async function loadCurrent(includeAnswers=1){
-  const r = await fetch(API+'/api/hour/current?include_answers='+includeAnswers);
+  const qs = includeAnswers ? '&order=newest&limit='+FEED_PAGE+'&top='+FEED_PAGE : '';
+  const r = await fetch(API+'/api/hour/current?include_answers='+includeAnswers+qs);
   const data = await r.json();
   currentHourId = data.hour.id;
   document.getElementById('question').textContent = data.hour.text;
-  document.getElementById('countdown').textContent = fmtCountdown(data.countdown_seconds);
+  hourEndsAt = Date.now() + data.countdown_seconds*1000;
   document.getElementById('stanceWrap').classList.toggle('hidden', !!data.hour.open_mode);
-  if (includeAnswers) renderFeed(data.answers||[]);
-  // If very near hour end, prefetch top once
-  if (data.countdown_seconds <= 3) showTopAndWipeSoon();
-}}
+  if (includeAnswers) renderFeed(mergeFeed(data.top||[], data.answers||[]));
+  clockTick();
+  return data;
+}
+
+function clockTick(){
+  // runs every second, independent of poll_ms (which can be 8-15s when quiet or loaded)
+  if (!currentHourId) return;
+  const left = Math.max(0, Math.round((hourEndsAt - Date.now())/1000));
+  document.getElementById('countdown').textContent = fmtCountdown(left);
+  // If very near hour end, prefetch top once per hour
+  if (left <= 3 && topShownForHour !== currentHourId) {
+    topShownForHour = currentHourId;
+    showTopAndWipeSoon();
+  }
+}
 
 function avatarNode(a){
   const wrap = document.createElement('div');
@@ -564,7 +1014,12 @@ function avatarNode(a){
     wrap.textContent = a.avatar?.emoji || '😶';
   }
   return wrap;
-}}
+}
+
+function mergeFeed(top, newest){
+  const seen = new Set(top.map(a => a.id));
+  return top.concat(newest.filter(a => !seen.has(a.id)));
+}
 
 function renderFeed(list){
   const feed = document.getElementById('feed'); feed.innerHTML='';
@@ -584,7 +1039,7 @@ function renderFeed(list){
     row.appendChild(av); row.appendChild(body); row.appendChild(like); row.appendChild(unlike);
     feed.appendChild(row);
   });
-}}
+}
 
 async function react(answer_id, kind){
   if (!session) return;
@@ -593,7 +1048,7 @@ async function react(answer_id, kind){
     body: JSON.stringify({session_id:session.id, answer_id, kind})
   });
   loadCurrent(1);
-}}
+}
 
 async function postAnswer(){
   if (alreadyPosted) return;
@@ -628,19 +1083,30 @@ async function postAnswer(){
   } else {
     alert('Error posting.');
   }
-}}
+}
 
 async function showTopAndWipeSoon(){
   const r = await fetch(API+'/api/hour/top'); const d = await r.json();
   if (d.top){
     alert('Top Answer: '+d.top.text+'  (score '+d.top.score+')');
   }
-}}
+}
 
-function tick(){
-  // pull current & feed frequently (polling)
-  loadCurrent(1);
-}}
+function jittered(ms){
+  return Math.round(ms * (1 - POLL_JITTER + Math.random() * 2 * POLL_JITTER));
+}
+
+async function tick(){
+  // pull current & feed, then wait as long as the server asks (poll_ms)
+  let next = POLL_DEFAULT_MS;
+  try {
+    const data = await loadCurrent(1);
+    next = data.poll_ms || POLL_DEFAULT_MS;
+  } catch (e) {
+    next = POLL_ERROR_MS;
+  }
+  setTimeout(tick, jittered(next));
+}
 
 document.addEventListener('DOMContentLoaded', async ()=>{
   await ensureSession();
@@ -657,8 +1123,8 @@ document.addEventListener('DOMContentLoaded', async ()=>{
   });
   submit.addEventListener('click', postAnswer);
   setMeter('green');
-  loadCurrent(1);
-  setInterval(tick, 2000);
+  tick();
+  setInterval(clockTick, 1000);
 });
 </script>
 
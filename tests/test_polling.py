@@ -0,0 +1,108 @@
+"""Unit tests for the adaptive poll-interval controller in agorhour.py.
+
+agorhour.py is a one-paste app: importing it installs packages, connects to Supabase and
+starts the scheduler. The controller is pure, so we lift just its config and functions
+out of the source with ast instead of importing the module.
+"""
+
+import ast
+import heapq
+import math
+import random
+from collections import deque
+from pathlib import Path
+
+import pytest
+
+SOURCE = Path(__file__).resolve().parent.parent / "agorhour.py"
+CONSTANTS = {
+    "POLL_BASE_MS": 2000, "POLL_MIN_MS": 1000, "POLL_MAX_MS": 15000,
+    "POLL_BUDGET_RPS": 50.0, "POLL_MAX_INFLIGHT": 32,
+}
+LIFTED = {"LOAD_WINDOW_SECONDS", "QUIET_AFTER_SECONDS", "HOUR_END_FAST_SECONDS",
+          "poll_interval_ms", "smooth_issued_ms"}
+
+
+def load_controller(**overrides):
+    tree = ast.parse(SOURCE.read_text(encoding="utf-8"))
+    body = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in LIFTED:
+            body.append(node)
+        elif isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id in LIFTED for t in node.targets):
+            body.append(node)
+    ns = {"math": math, **CONSTANTS, **overrides}
+    exec(compile(ast.Module(body=body, type_ignores=[]), str(SOURCE), "exec"), ns)
+    return ns
+
+
+@pytest.fixture
+def ctl():
+    return load_controller()
+
+
+def simulate(ctl, clients, seconds=240, jitter=0.2, seed=1):
+    """Clients that obey poll_ms (±jitter); returns steady-state requests/second over the last minute."""
+    rng = random.Random(seed)
+    window = ctl["LOAD_WINDOW_SECONDS"]
+    poll, smooth = ctl["poll_interval_ms"], ctl["smooth_issued_ms"]
+    issued, issued_at = float(ctl["POLL_BASE_MS"]), 0.0
+    recent = deque()
+    served = 0
+    events = [(rng.uniform(0, 2.0), i) for i in range(clients)]
+    heapq.heapify(events)
+    while events:
+        t, i = heapq.heappop(events)
+        if t > seconds:
+            break
+        recent.append(t)
+        while recent and recent[0] < t - window:
+            recent.popleft()
+        if t > seconds - 60:
+            served += 1
+        ms = poll(3600, 0.0, len(recent) / window, 0, issued)
+        issued = smooth(issued, ms, t - issued_at)
+        issued_at = t
+        heapq.heappush(events, (t + ms / 1000.0 * (1 - jitter + 2 * jitter * rng.random()), i))
+    return served / 60.0
+
+
+@pytest.mark.parametrize("clients", [200, 500, 1000, 3000])
+def test_load_held_at_budget(ctl, clients):
+    # at the budget, or as close as the POLL_MAX_MS cap allows (1000 clients at 15 s → 67 rps)
+    expected = max(ctl["POLL_BUDGET_RPS"], clients / (ctl["POLL_MAX_MS"] / 1000.0))
+    assert simulate(ctl, clients) == pytest.approx(expected, rel=0.15)
+
+
+def test_under_budget_uses_base_interval(ctl):
+    assert ctl["poll_interval_ms"](3600, 0.0, 10.0, 0, 2000.0) == 2000
+
+
+def test_quiet_feed_backs_off_up_to_four_times_base(ctl):
+    poll = ctl["poll_interval_ms"]
+    assert poll(3600, 90.0, 1.0, 0, 2000.0) == 3000
+    assert poll(3600, 10_000.0, 1.0, 0, 2000.0) == 8000
+
+
+def test_inflight_over_limit_stretches_issued_interval(ctl):
+    assert ctl["poll_interval_ms"](3600, 0.0, 1.0, 64, 3000.0) == 6000
+
+
+def test_hour_end_halves_base_interval(ctl):
+    assert ctl["poll_interval_ms"](30, 0.0, 1.0, 0, 2000.0) == 1000
+
+
+def test_hour_end_caps_load_scaling_at_time_left(ctl):
+    # heavily loaded: would be 15 s, but the next poll must land by the end of the hour
+    assert ctl["poll_interval_ms"](4, 0.0, 500.0, 100, 15000.0) == 4000
+    assert ctl["poll_interval_ms"](0, 0.0, 500.0, 100, 15000.0) == ctl["POLL_MIN_MS"]
+
+
+def test_smoothing_converges_over_load_window(ctl):
+    smooth = ctl["smooth_issued_ms"]
+    assert smooth(2000.0, 8000.0, 0.0) == 2000.0
+    v = 2000.0
+    for _ in range(100):
+        v = smooth(v, 8000.0, 1.0)
+    assert v == pytest.approx(8000.0, rel=1e-3)